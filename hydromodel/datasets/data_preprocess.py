@@ -506,10 +506,16 @@ def _get_pe_q_from_ts(ts_xr_dataset):
     prcp_name = remove_unit_from_name(PRCP_NAME)
     pet_name = remove_unit_from_name(PET_NAME)
     flow_name = remove_unit_from_name(FLOW_NAME)
-    p_and_e = (
-        ts_xr_dataset[[prcp_name, pet_name]].to_array().to_numpy().transpose(2, 1, 0)
+    prcp = ts_xr_dataset[prcp_name].transpose("time", "basin").to_numpy()
+    pet = ts_xr_dataset[pet_name].transpose("time", "basin").to_numpy()
+    # fill the [time, basin, feature] array directly so that it is C-contiguous and
+    # each time step the models read is one contiguous block
+    p_and_e = np.empty(prcp.shape + (2,), dtype=np.result_type(prcp, pet))
+    p_and_e[:, :, 0] = prcp
+    p_and_e[:, :, 1] = pet
+    qobs = np.expand_dims(
+        ts_xr_dataset[flow_name].transpose("time", "basin").to_numpy(), axis=2
     )
-    qobs = np.expand_dims(ts_xr_dataset[flow_name].to_numpy().transpose(1, 0), axis=2)
 
     return p_and_e, qobs
 
@@ -635,6 +635,38 @@ def linear_reservoir(x, weight, last_y=None) -> np.array:
     return weight * last_y + weight1 * x
 
 
+@jit(nopython=True)
+def lag_route(qt, cs, l) -> np.array:
+    """
+    Lag-and-route method for routing ("CSL"), calculated basin by basin
+
+    Parameters
+    ----------
+    qt
+        the total outflow before routing, dim: [time, basin]
+    cs
+        the recession constant of each basin
+    l
+        the lag time of each basin
+
+    Returns
+    -------
+    np.array
+        the streamflow after routing, dim: [time, basin]
+    """
+    qs = np.zeros(qt.shape)
+    for j in range(qt.shape[1]):
+        lag = int(l[j])
+        if lag > qt.shape[0]:
+            # numba doesn't check bounds, so we raise the error of python indexing here
+            raise IndexError("lag time is longer than the length of the time series")
+        for i in range(lag):
+            qs[i, j] = qt[i, j]
+        for i in range(lag, qt.shape[0]):
+            qs[i, j] = cs[j] * qs[i - 1, j] + (1 - cs[j]) * qt[i - lag, j]
+    return qs
+
+
 def uh_conv(x, uh_from_gamma):
     """
     Function for 1d-convolution calculation
@@ -905,7 +937,6 @@ def xaj(
     rss = np.expand_dims(rss_, axis=2)
     es = np.expand_dims(es_, axis=2)
 
-    qs = np.full(inputs.shape[:2], 0.0)
     if route_method == "CSL":
         qt = np.full(inputs.shape[:2], 0.0)
         for i in range(inputs.shape[0]):
@@ -918,13 +949,9 @@ def xaj(
             # Don't forget the runoff_im
             qs_ = rss_[i] + runoff_ims_[i]
             qt[i, :] = qs_ + qi + qg
-        for j in range(len(l)):
-            lag = int(l[j])
-            for i in range(lag):
-                qs[i, j] = qt[i, j]
-            for i in range(lag, inputs.shape[0]):
-                qs[i, j] = cs[j] * qs[i - 1, j] + (1 - cs[j]) * qt[i - lag, j]
+        qs = lag_route(qt, cs, l)
     elif route_method == "MZ":
+        qs = np.full(inputs.shape[:2], 0.0)
         rout_a = a.repeat(rss.shape[0]).reshape(rss.shape)
         rout_b = theta.repeat(rss.shape[0]).reshape(rss.shape)
         conv_uh = uh_gamma(rout_a, rout_b, kernel_size)
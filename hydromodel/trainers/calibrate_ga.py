@@ -318,11 +318,8 @@ def show_ga_result(
         deap_dir,
         f"{train_test_flag}_qsim_" + model_info["name"] + "_" + str(basin_id) + ".csv",
     )
-    pd.DataFrame(convert_unit_sim.reshape(-1, 1)).to_csv(
-        the_result_file,
-        sep=",",
-        index=False,
-        header=False,
+    np.savetxt(
+        the_result_file, convert_unit_sim.reshape(-1, 1), fmt="%s", delimiter=","
     )
     # calculation rmse、nashsutcliffe and bias for training period
     stat_error = hydro_stat.stat_error(
@@ -337,8 +334,13 @@ def show_ga_result(
     save_fig = os.path.join(deap_dir, f"{train_test_flag}_results.png")
     if train_mode:
         save_param_file = os.path.join(deap_dir, basin_id + "_calibrate_params.txt")
-        pd.DataFrame(list(halloffame[0])).to_csv(
-            save_param_file, sep=",", index=False, header=True
+        # same format as the SCE-UA params file: a header "0" and one param per line
+        np.savetxt(
+            save_param_file,
+            np.array(list(halloffame[0])),
+            fmt="%s",
+            header="0",
+            comments="",
         )
         fit_mins = logbook.select("min")
         plot_train_iteration(fit_mins, os.path.join(deap_dir, "train_iteration.png"))
@@ -364,7 +366,8 @@ if __name__ == "__main__":
     )
     train_data_info_file = os.path.join(data_dir, "data_info_fold0_train.json")
     train_data_file = os.path.join(data_dir, "basins_lump_p_pe_q_fold0_train.npy")
-    data_train = hydro_file.unserialize_numpy(train_data_file)
+    # memory-map the file rather than loading it; only pages of the used slice are read
+    data_train = np.load(train_data_file, mmap_mode="r")
     data_info_train = hydro_file.unserialize_json_ordered(train_data_info_file)
     model_info = {
         "name": "xaj_mz",
@@ -8,7 +8,9 @@ FilePath: \hydromodel\hydromodel\trainers\evaluate.py
 Copyright (c) 2023-2024 Wenyu Ouyang. All rights reserved.
 """
 
+import contextlib
 import os
+from concurrent.futures import ThreadPoolExecutor
 import yaml
 import numpy as np
 import pandas as pd
@@ -51,18 +53,22 @@ class Evaluator:
         self.save_dir = eval_dir
         self.params_dir = param_dir
         self.param_range_file = cali_config["param_range_file"]
+        self.model_param_dict = read_model_param_dict(self.param_range_file)
         if not os.path.exists(param_dir):
             os.makedirs(param_dir)
         if not os.path.exists(eval_dir):
             os.makedirs(eval_dir)
 
-    def predict(self, ds):
+    def predict(self, ds, params=None):
         """predict the streamflow of all basins in ds
 
         Parameters
         ----------
         ds : xr.Dataset
             the input dataset
+        params : np.ndarray, optional
+            calibrated parameters of all basins in ds, dim: [basin, parameter];
+            if None, we read them from params_dir
 
         Returns
         -------
@@ -72,7 +78,12 @@ class Evaluator:
         model_info = self.model_info
         p_and_e, _ = _get_pe_q_from_ts(ds)
         basins = ds["basin"].data.astype(str)
-        params = _read_all_basin_params(basins, self.params_dir)
+        if params is None:
+            params = self.load_params(basins)
+        elif params.shape[0] != len(basins):
+            raise ValueError(
+                f"params has {params.shape[0]} basins but ds has {len(basins)} basins"
+            )
         qsim, etsim = MODEL_DICT[model_info["name"]](
             p_and_e,
             params,
@@ -99,10 +110,13 @@ class Evaluator:
             simulated evapotranspiration with unit of mm/time_unit(d, h, etc.)
         """
         basins = ds["basin"].data.astype(str)
-        self._summarize_parameters(basins)
-        self._renormalize_params(basins)
-        self._save_evaluate_results(qsim, qobs, etsim, ds)
-        self._summarize_metrics(basins)
+        # read the calibrated parameters once for both summaries
+        params = _read_all_calibrated_params(basins, self.params_dir)
+        self._summarize_parameters(basins, params)
+        self._renormalize_params(basins, params)
+        # reuse the results in memory rather than reading back the file just written
+        results = self._save_evaluate_results(qsim, qobs, etsim, ds)
+        self._summarize_metrics(basins, results)
 
     def _convert_streamflow_units(self, test_data, qsim, etsim):
         """convert the streamflow units to m^3/s and save all variables to xr.Dataset
@@ -154,16 +168,16 @@ class Evaluator:
         )
         return ds_simflow, ds_obsflow, ds_et
 
-    def _summarize_parameters(self, basin_ids):
+    def _summarize_parameters(self, basin_ids, params):
         """
         output parameters of all basins to one file
 
         Parameters
         ----------
-        param_dir
-            the directory where we save params
-        model_name
-            the name of the model
+        basin_ids
+            the ids of basins
+        params
+            normalized calibrated parameters of all basins, dim: [basin, parameter]
 
         Returns
         -------
@@ -171,48 +185,32 @@ class Evaluator:
         """
         param_dir = self.params_dir
         model_name = self.model_info["name"]
-        params = []
-        model_param_dict = read_model_param_dict(self.param_range_file)
-        for basin_id in basin_ids:
-            columns = model_param_dict[model_name]["param_name"]
-            params_txt = pd.read_csv(
-                os.path.join(param_dir, basin_id + "_calibrate_params.txt")
-            )
-            params_df = pd.DataFrame(params_txt.values.T, columns=columns)
-            params.append(params_df)
-        params_dfs = pd.concat(params, axis=0)
-        params_dfs.index = basin_ids
+        columns = self.model_param_dict[model_name]["param_name"]
+        params_dfs = pd.DataFrame(params, index=basin_ids, columns=columns)
         print(params_dfs)
         params_csv_file = os.path.join(param_dir, "basins_norm_params.csv")
         params_dfs.to_csv(params_csv_file, sep=",", index=True, header=True)
 
-    def _renormalize_params(self, basin_ids):
+    def _renormalize_params(self, basin_ids, params):
         param_dir = self.params_dir
         model_name = self.model_info["name"]
-        renormalization_params = []
-        model_param_dict = read_model_param_dict(self.param_range_file)
-        for basin_id in basin_ids:
-            params = np.loadtxt(
-                os.path.join(param_dir, basin_id + "_calibrate_params.txt")
-            )[1:].reshape(1, -1)
-            param_ranges = model_param_dict[model_name]["param_range"]
-            xaj_params = [
-                (value[1] - value[0]) * params[:, i] + value[0]
-                for i, (key, value) in enumerate(param_ranges.items())
-            ]
-            xaj_params_ = np.array([x for j in xaj_params for x in j])
-            params_df = pd.DataFrame(xaj_params_.T)
-            renormalization_params.append(params_df)
-        renormalization_params_dfs = pd.concat(renormalization_params, axis=1)
-        renormalization_params_dfs.index = model_param_dict[model_name]["param_name"]
-        renormalization_params_dfs.columns = basin_ids
+        param_ranges = self.model_param_dict[model_name]["param_range"]
+        lows = np.array([value[0] for value in param_ranges.values()])
+        highs = np.array([value[1] for value in param_ranges.values()])
+        # dim: [basin, parameter], the same layout as the output file
+        renormalization_params = (highs - lows) * params + lows
+        renormalization_params_dfs = pd.DataFrame(
+            renormalization_params,
+            index=basin_ids,
+            columns=self.model_param_dict[model_name]["param_name"],
+        )
         print(renormalization_params_dfs)
         params_csv_file = os.path.join(param_dir, "basins_denorm_params.csv")
-        renormalization_params_dfs.transpose().to_csv(
+        renormalization_params_dfs.to_csv(
             params_csv_file, sep=",", index=True, header=True
         )
 
-    def _summarize_metrics(self, basin_ids):
+    def _summarize_metrics(self, basin_ids, results=None):
         """
         output all results' metrics of basins to one file
 
@@ -220,19 +218,25 @@ class Evaluator:
         ----------
         basin_ids
             the ids of basins
+        results
+            the evaluation results from _save_evaluate_results;
+            if None, we read them from the saved file
 
         Returns
         -------
 
         """
         result_dir = self.save_dir
-        model_name = self.model_info["name"]
-        file_path = os.path.join(result_dir, f"{model_name}_evaluation_results.nc")
-        ds = xr.open_dataset(file_path)
         # for metrics, warmup_length should be considered
         warmup_length = self.config["warmup"]
-        qobs = ds["qobs"].transpose("basin", "time").to_numpy()[:, warmup_length:]
-        qsim = ds["qsim"].transpose("basin", "time").to_numpy()[:, warmup_length:]
+        # only close the dataset when we open the saved file here
+        with (
+            self.load_results() if results is None else contextlib.nullcontext(results)
+        ) as ds:
+            # only load the period after warmup
+            ds_eval = ds[["qobs", "qsim"]].isel(time=slice(warmup_length, None))
+            qobs = ds_eval["qobs"].transpose("basin", "time").to_numpy()
+            qsim = ds_eval["qsim"].transpose("basin", "time").to_numpy()
         test_metrics = hydro_stat.stat_error(
             qobs,
             qsim,
@@ -257,9 +261,25 @@ class Evaluator:
 
         # 保存为 .nc 文件
         file_path = os.path.join(result_dir, f"{model_name}_evaluation_results.nc")
-        ds.to_netcdf(file_path)
+        ds.to_netcdf(file_path, format="NETCDF4", encoding=_netcdf_encoding(ds))
 
         print(f"Results saved to: {file_path}")
+        return ds
+
+    def load_params(self, basins):
+        """read calibrated parameters of basins from params_dir
+
+        Parameters
+        ----------
+        basins : list of str
+            the ids of basins
+
+        Returns
+        -------
+        np.ndarray
+            parameters of all basins, dim: [basin, parameter]
+        """
+        return _read_all_basin_params(basins, self.params_dir)
 
     def load_results(self):
         result_dir = self.save_dir
@@ -268,6 +288,40 @@ class Evaluator:
         return xr.open_dataset(file_path)
 
 
+def _netcdf_encoding(ds, time_chunk=1024):
+    """chunk every variable along time and keep all basins in one chunk
+
+    Parameters
+    ----------
+    ds : xr.Dataset
+        the dataset to be saved
+    time_chunk : int, optional
+        the max length of a chunk in time dimension, by default 1024
+
+    Returns
+    -------
+    dict
+        encoding for xr.Dataset.to_netcdf; the dtype and packing of each variable
+        (e.g. prcp and pet read from a packed file) are kept
+    """
+    encoding = {}
+    for var in ds.data_vars:
+        var_encoding = {
+            key: ds[var].encoding[key]
+            for key in ["dtype", "_FillValue", "scale_factor", "add_offset"]
+            if key in ds[var].encoding
+        }
+        # chunk sizes must be positive even when a dimension is empty
+        var_encoding["chunksizes"] = tuple(
+            max(1, min(time_chunk, size) if dim == "time" else size)
+            for dim, size in zip(ds[var].dims, ds[var].shape)
+        )
+        var_encoding["zlib"] = False
+        var_encoding["shuffle"] = False
+        encoding[var] = var_encoding
+    return encoding
+
+
 def _load_csv_results_pandas(sceua_calibrated_file_name):
     return pd.read_csv(sceua_calibrated_file_name + ".csv")
 
@@ -321,32 +375,104 @@ def _read_save_sceua_calibrated_params(basin_id, save_dir, sceua_calibrated_file
     """
     results = _load_csv_results_pandas(sceua_calibrated_file_name)
     # Index of the position in the results array with the minimum objective function
-    bestindex, bestobjf = _get_minlikeindex_pandas(results)
+    bestindex, bestobjf = _get_minlikeindex_pandas(results, verbose=False)
+    # basins may be read in parallel, so the basin id is put in the message
+    print(
+        f"Basin {basin_id}: run number {bestindex} has the lowest objective function "
+        f"with: {round(bestobjf, 4)}"
+    )
     # the following code is from spotpy but its performance is not good so we use pandas to replace it
     # results = spotpy.analyser.load_csv_results(sceua_calibrated_file_name)
     # bestindex, bestobjf = spotpy.analyser.get_minlikeindex(results)
-    best_model_run = results.iloc[bestindex]
-    fields = [word for word in best_model_run.index if word.startswith("par")]
-    best_calibrate_params = pd.DataFrame(
-        [best_model_run[fields].values], columns=fields
-    )
+    # select the parameter columns of the best run directly, without building the whole
+    # row (which also has all simulation_* columns) and filtering its labels one by one
+    is_param = results.columns.str.startswith("par")
+    best_calibrate_params = results.iloc[bestindex, is_param].to_numpy(dtype=np.float64)
     save_file = os.path.join(save_dir, basin_id + "_calibrate_params.txt")
     # to keep consistent with the original code, we save the best parameters to a txt file
-    best_calibrate_params.T.to_csv(save_file, index=False, columns=None)
+    # -- a header line "0" followed by one parameter per line
+    np.savetxt(save_file, best_calibrate_params, fmt="%s", header="0", comments="")
     # Return the best result as a single row
-    return best_calibrate_params.to_numpy().reshape(1, -1)
+    return best_calibrate_params.reshape(1, -1)
+
+
+def _read_calibrated_params(basin_id, param_dir):
+    """read the parameters saved by _read_save_sceua_calibrated_params as a 1-d array"""
+    return np.loadtxt(
+        os.path.join(param_dir, basin_id + "_calibrate_params.txt"),
+        delimiter=",",
+        skiprows=1,
+    )
+
+
+def _map_basins(func, basin_ids):
+    """call func for each basin in a thread pool
+
+    Reading basins' files is not purely I/O-bound: parsing spotpy's csv results with
+    pandas is CPU work. Threads still help, as file reads and the C parser of pandas
+    release the GIL for part of the work, but the speedup is not linear.
+
+    Parameters
+    ----------
+    func
+        a function with basin_id as its only argument
+    basin_ids
+        the ids of basins
+
+    Returns
+    -------
+    list
+        results of func, in the same order as basin_ids
+    """
+    max_workers = max(1, min(32, len(basin_ids)))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(func, basin_ids))
+
+
+def _read_basin_rows(read_func, basin_ids):
+    """call read_func for each basin in a thread pool and fill its 1-d result into
+    one row of a preallocated array
+
+    Parameters
+    ----------
+    read_func
+        a function with basin_id as its only argument, returning a 1-d np.ndarray
+    basin_ids
+        the ids of basins
+
+    Returns
+    -------
+    np.ndarray
+        results of all basins, dim: [basin, len of read_func's result]
+    """
+    # read the first basin to know the length of a row, then fill the rest in place
+    first_row = read_func(basin_ids[0])
+    rows = np.empty((len(basin_ids), first_row.size))
+    rows[0] = first_row
+
+    def fill_row(i):
+        rows[i] = read_func(basin_ids[i])
+
+    _map_basins(fill_row, range(1, len(basin_ids)))
+    return rows
+
+
+def _read_all_calibrated_params(basin_ids, param_dir):
+    """read the saved calibrated parameters of all basins, dim: [basin, parameter]"""
+    return _read_basin_rows(
+        lambda basin_id: _read_calibrated_params(basin_id, param_dir), basin_ids
+    )
 
 
 def _read_all_basin_params(basins, param_dir):
-    params_list = []
-    for basin_id in basins:
+    def read_basin_params(basin_id):
         db_name = os.path.join(param_dir, basin_id)
         # Read parameters for each basin
         basin_params = _read_save_sceua_calibrated_params(basin_id, param_dir, db_name)
         # Ensure basin_params is one-dimensional
-        basin_params = basin_params.flatten()
-        params_list.append(basin_params)
-    return np.vstack(params_list)
+        return basin_params.ravel()
+
+    return _read_basin_rows(read_basin_params, basins)
 
 
 def read_yaml_config(file_path):
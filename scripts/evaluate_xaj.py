@@ -12,6 +12,7 @@ import argparse
 import os
 import sys
 from pathlib import Path
+import numpy as np
 
 
 repo_path = os.path.dirname(Path(os.path.abspath(__file__)).parent)
@@ -72,8 +73,14 @@ def _evaluate(cali_dir, param_dir, train_data, test_data):
     eval_test_dir = os.path.join(param_dir, "test")
     train_eval = Evaluator(cali_dir, param_dir, eval_train_dir)
     test_eval = Evaluator(cali_dir, param_dir, eval_test_dir)
-    qsim_train, qobs_train, etsim_train = train_eval.predict(train_data)
-    qsim_test, qobs_test, etsim_test = test_eval.predict(test_data)
+    params = train_eval.load_params(train_data["basin"].data.astype(str))
+    qsim_train, qobs_train, etsim_train = train_eval.predict(train_data, params)
+    # train and test periods share the same calibrated parameters, so reuse them when
+    # both have the same basins in the same order
+    if np.array_equal(train_data["basin"].data, test_data["basin"].data):
+        qsim_test, qobs_test, etsim_test = test_eval.predict(test_data, params)
+    else:
+        qsim_test, qobs_test, etsim_test = test_eval.predict(test_data)
     train_eval.save_results(
         train_data,
         qsim_train,
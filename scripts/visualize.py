@@ -53,25 +53,28 @@ def _visualize_1fold(cali_dir, basins, warmup):
 def _visualize(cali_dir, basins, warmup, param_dir, eval_train_dir, eval_test_dir):
     train_eval = Evaluator(cali_dir, param_dir, eval_train_dir)
     test_eval = Evaluator(cali_dir, param_dir, eval_test_dir)
-    ds_train = train_eval.load_results()
-    ds_test = test_eval.load_results()
+    # drop the warmup period once for all basins instead of in every plot
+    ds_train = train_eval.load_results().isel(time=slice(warmup, None))
+    ds_test = test_eval.load_results().isel(time=slice(warmup, None))
     for basin in basins:
+        basin_train = ds_train.sel(basin=basin)
         save_fig_train = os.path.join(eval_train_dir, f"train_sim_obs_{basin}.png")
         plot_sim_and_obs(
-            ds_train["time"].isel(time=slice(warmup, None)),
-            ds_train["prcp"].sel(basin=basin).isel(time=slice(warmup, None)),
-            ds_train["qsim"].sel(basin=basin).isel(time=slice(warmup, None)),
-            ds_train["qobs"].sel(basin=basin).isel(time=slice(warmup, None)),
+            ds_train["time"],
+            basin_train["prcp"],
+            basin_train["qsim"],
+            basin_train["qobs"],
             save_fig_train,
             xlabel="Date",
             ylabel=None,
         )
+        basin_test = ds_test.sel(basin=basin)
         save_fig_test = os.path.join(eval_test_dir, f"test_sim_obs_{basin}.png")
         plot_sim_and_obs(
-            ds_test["time"].isel(time=slice(warmup, None)),
-            ds_test["prcp"].sel(basin=basin).isel(time=slice(warmup, None)),
-            ds_test["qsim"].sel(basin=basin).isel(time=slice(warmup, None)),
-            ds_test["qobs"].sel(basin=basin).isel(time=slice(warmup, None)),
+            ds_test["time"],
+            basin_test["prcp"],
+            basin_test["qsim"],
+            basin_test["qobs"],
             save_fig_test,
             xlabel="Date",
             ylabel=None,
@@ -15,7 +15,13 @@ import numpy as np
 
 from spotpy.analyser import get_minlikeindex
 
-from hydromodel.trainers.evaluate import Evaluator, _get_minlikeindex_pandas
+from hydromodel.trainers.evaluate import (
+    Evaluator,
+    _get_minlikeindex_pandas,
+    _read_all_basin_params,
+    _read_calibrated_params,
+    _read_save_sceua_calibrated_params,
+)
 
 
 @pytest.fixture
@@ -129,3 +135,89 @@ def test_get_minlikeindex(hymod_setup):
     ), f"Minimum value mismatch: {original_minimum} != {new_minimum}"
 
     print("Test passed! Both methods return identical results.")
+
+
+def test_save_evaluate_results_chunksizes(evaluator, tmp_path):
+    times = pd.date_range("2000-01-01", periods=1500)
+    basins = ["basin1", "basin2"]
+    coords = {"time": times, "basin": basins}
+    # simulated variables are [time, basin] while observations are [basin, time]
+    flow = xr.Dataset({"flow": (("time", "basin"), np.random.rand(1500, 2))}, coords)
+    et = xr.Dataset({"et": (("time", "basin"), np.random.rand(1500, 2))}, coords)
+    obs_ds = xr.Dataset(
+        {
+            "prcp": (("basin", "time"), np.random.rand(2, 1500)),
+            "pet": (("basin", "time"), np.random.rand(2, 1500)),
+        },
+        coords,
+    )
+    # prcp read from a file where it is packed as int16 keeps its packing
+    obs_ds["prcp"].encoding = {
+        "dtype": "int16",
+        "scale_factor": 0.001,
+        "_FillValue": np.int16(-9999),
+    }
+    obs_ds.to_netcdf(tmp_path / "obs.nc")
+    obs_ds = xr.open_dataset(tmp_path / "obs.nc")
+    evaluator.save_dir = str(tmp_path)
+
+    evaluator._save_evaluate_results(flow, flow, et, obs_ds)
+
+    with xr.open_dataset(tmp_path / "xaj_mz_evaluation_results.nc") as ds:
+        for var in ["qsim", "qobs", "etsim"]:
+            assert ds[var].encoding["chunksizes"] == (1024, 2)
+        for var in ["prcp", "pet"]:
+            assert ds[var].encoding["chunksizes"] == (2, 1024)
+        np.testing.assert_array_equal(ds["qsim"].values, flow["flow"].values)
+        np.testing.assert_array_equal(ds["prcp"].values, obs_ds["prcp"].values)
+        assert ds["prcp"].encoding["dtype"] == np.dtype("int16")
+        assert ds["prcp"].encoding["scale_factor"] == 0.001
+    obs_ds.close()
+
+
+def _write_sceua_results(file_name, best_params, n_runs=5):
+    """write a csv like spotpy's SCE-UA results whose best run has best_params"""
+    likes = np.arange(1.0, n_runs + 1)
+    results = {"like1": likes}
+    for i, best_param in enumerate(best_params):
+        param = np.random.rand(n_runs)
+        # the 3rd run has the minimum objective function
+        param[2] = best_param
+        results[f"par{i}"] = param
+    results["like1"][2] = 0.5
+    results["simulation_0"] = np.random.rand(n_runs)
+    results["chain"] = np.zeros(n_runs)
+    pd.DataFrame(results).to_csv(f"{file_name}.csv", index=False)
+
+
+def test_read_save_sceua_calibrated_params_roundtrip(tmp_path):
+    best_params = np.array([0.1, 1 / 3, 0.123456789012345678, 1e-10])
+    _write_sceua_results(tmp_path / "basin1", best_params)
+
+    params = _read_save_sceua_calibrated_params(
+        "basin1", str(tmp_path), str(tmp_path / "basin1")
+    )
+
+    # pandas' default csv parser may differ from the written value in the last bit
+    np.testing.assert_allclose(params, best_params.reshape(1, -1), rtol=1e-14)
+    lines = (tmp_path / "basin1_calibrate_params.txt").read_text().splitlines()
+    assert lines[0] == "0"
+    assert lines[1:] == [str(value) for value in params.ravel()]
+    # saved in the shortest repr, so the values are read back exactly
+    np.testing.assert_array_equal(
+        _read_calibrated_params("basin1", str(tmp_path)), params.ravel()
+    )
+
+
+def test_read_all_basin_params_keeps_basin_order(tmp_path):
+    basins = [f"basin{i}" for i in range(5)]
+    # dyadic values so that pandas' csv parser reads them back exactly
+    best_params = {basin: (np.arange(3) + 3 * i) / 16 for i, basin in enumerate(basins)}
+    for basin in basins:
+        _write_sceua_results(tmp_path / basin, best_params[basin])
+
+    params = _read_all_basin_params(basins, str(tmp_path))
+
+    np.testing.assert_array_equal(
+        params, np.stack([best_params[basin] for basin in basins])
+    )
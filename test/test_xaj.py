@@ -1,7 +1,7 @@
 import numpy as np
 import pytest
 
-from hydromodel.models.xaj import xaj, uh_gamma, uh_conv
+from hydromodel.models.xaj import xaj, uh_gamma, uh_conv, lag_route
 
 
 @pytest.fixture()
@@ -87,3 +87,33 @@ def test_xaj_mz(p_and_e, params, warmup_length):
         source_type="sources",
     )
     np.testing.assert_array_equal(qsim.shape[0], p_and_e.shape[0] - warmup_length)
+
+
+def lag_route_loop(qt, cs, l):
+    # the python loop used in xaj before lag_route was compiled by numba
+    qs = np.full(qt.shape, 0.0)
+    for j in range(len(l)):
+        lag = int(l[j])
+        for i in range(lag):
+            qs[i, j] = qt[i, j]
+        for i in range(lag, qt.shape[0]):
+            qs[i, j] = cs[j] * qs[i - 1, j] + (1 - cs[j]) * qt[i - lag, j]
+    return qs
+
+
+def test_lag_route():
+    qt = np.random.rand(20, 4)
+    cs = np.array([0.3, 0.5, 0.7, 0.9])
+    # no lag, fractional lag and lag as long as the time series
+    l = np.array([0.0, 2.7, 5.2, 20.0])
+    np.testing.assert_array_equal(lag_route(qt, cs, l), lag_route_loop(qt, cs, l))
+
+
+def test_lag_route_lag_longer_than_series():
+    qt = np.random.rand(20, 2)
+    cs = np.array([0.5, 0.5])
+    l = np.array([1.0, 21.0])
+    with pytest.raises(IndexError):
+        lag_route_loop(qt, cs, l)
+    with pytest.raises(IndexError):
+        lag_route(qt, cs, l)